@@ -1,23 +1,30 @@
 import asyncio
 import httpx
 import logging
+import orjson
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import Dict, Any
-from .generator import CodeGenerator
+from typing import Dict, Any, Awaitable, Callable, List, Optional, Tuple
+from dotenv import load_dotenv
+
+# Load .env once, before importing modules that read the environment
+load_dotenv()
+
+from .generator import CodeGenerator, load_problem, prefetch_problems
+from .http_clients import llm_async_client
 from .dumb_generator import DumbCodeGenerator
-from .models import Verdict, CodeGenerationRequest, CodeGenerationResponse, VerdictStatus
+from .models import Verdict, CodeGenerationRequest, CodeGenerationBatchRequest, CodeGenerationResponse, VerdictStatus
+from .utils import list_problems, problem_pool
+from .logging_setup import setup_logging
 
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 # Create FastAPI app
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 
 # Configure CORS
 app.add_middleware(
@@ -28,24 +35,153 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+SUBMISSION_SERVER_URL = "http://localhost:8000"
+LONG_POLL_SECONDS = 20  # Must stay below the client read timeout
+POLL_INITIAL_DELAY = 0.025  # seconds
+POLL_MAX_DELAY = 0.5  # seconds
+PENDING_STATUSES = ("QUEUED", "PROCESSING")
+
+# Progress callback: receives an event name and a JSON-serializable payload
+EmitFn = Callable[[str, dict], Awaitable[None]]
+
+# In-flight generations keyed by (model, problem_id), shared by concurrent identical requests
+_inflight: Dict[Tuple[str, str], asyncio.Task] = {}
+
+def create_http_client() -> httpx.AsyncClient:
+    """Build a pooled client for talking to the submission server."""
+    return httpx.AsyncClient(
+        base_url=SUBMISSION_SERVER_URL,
+        timeout=httpx.Timeout(30.0, connect=2.0),
+        limits=httpx.Limits(max_keepalive_connections=100, max_connections=200)
+    )
+
+def _json(response: httpx.Response) -> Any:
+    return orjson.loads(response.content)
+
+def validate_problem_id(problem_id: str):
+    """Reject malformed problem ids before doing any work."""
+    contest_name, _, problem_letter = problem_id.partition("/")
+    if not contest_name or not problem_letter or "/" in problem_letter or ".." in problem_id:
+        raise HTTPException(status_code=422, detail=f"Invalid problem_id: {problem_id}")
+
+def status_emitter(emit: EmitFn, submission_id: str) -> Callable[[str], Awaitable[None]]:
+    """Adapt `emit` into an on_status callback for wait_for_submission."""
+    return lambda status: emit("status", {"submission_id": submission_id, "status": status})
+
+async def prefetch_all_problems():
+    """Parse every problem in Contests/, starting with the pool served by /api/problems."""
+    try:
+        available = await asyncio.to_thread(list_problems)
+    except Exception as e:
+        logger.warning(f"Could not list problems to prefetch: {str(e)}")
+        available = frozenset()
+    # Skip pool problems missing on disk, which would only log errors
+    pool = [f"{contest}/{problem}" for contest, problem in problem_pool if (contest, problem) in available]
+    rest = sorted(f"{contest}/{problem}" for contest, problem in available)
+    await prefetch_problems(pool + [problem_id for problem_id in rest if problem_id not in pool])
+
+@app.on_event("startup")
+async def startup_event():
+    """Create the shared HTTP client and start warming the problem cache."""
+    app.state.http = create_http_client()
+    app.state.prefetch_task = asyncio.create_task(prefetch_all_problems())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Close the shared HTTP clients on shutdown."""
+    await app.state.http.aclose()
+    await llm_async_client.aclose()
+
 @app.post("/api/code_generation", response_model=CodeGenerationResponse)
 async def code_generation(request: CodeGenerationRequest):
     logger.info(f"Received code generation request for problem: {request.problem_id} with model: {request.model}")
+    validate_problem_id(request.problem_id)
     try:
-        return await handle_code_generation(request)
+        return await handle_code_generation(app.state.http, request)
     except Exception as e:
         logger.error(f"Error in code generation endpoint: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
-async def handle_code_generation(request: CodeGenerationRequest) -> CodeGenerationResponse:
+@app.post("/api/code_generation/stream")
+async def code_generation_stream(request: CodeGenerationRequest):
+    """Run a code generation, pushing progress as server-sent events.
+    
+    Emits `code`, `submitted` and `status` events while the request runs
+    and a final `verdict` event with the CodeGenerationResponse payload.
+    """
+    logger.info(f"Received streaming code generation request for problem: {request.problem_id} with model: {request.model}")
+    validate_problem_id(request.problem_id)
+    events: asyncio.Queue = asyncio.Queue()
+
+    async def emit(event: str, data: dict):
+        await events.put((event, data))
+
+    async def run():
+        try:
+            response = await handle_code_generation(app.state.http, request, emit)
+            await emit("verdict", response.model_dump(mode="json"))
+        except Exception as e:
+            logger.error(f"Error in streaming code generation: {str(e)}", exc_info=True)
+            await emit("error", {"detail": str(e)})
+        finally:
+            await events.put(None)
+
+    async def stream():
+        task = asyncio.create_task(run())
+        try:
+            while (item := await events.get()) is not None:
+                event, data = item
+                yield f"event: {event}\ndata: {orjson.dumps(data).decode()}\n\n"
+        finally:
+            task.cancel()
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+@app.post("/api/code_generation/batch", response_model=List[CodeGenerationResponse])
+async def code_generation_batch(request: CodeGenerationBatchRequest):
+    """Generate and judge a solution from each model concurrently, in request order."""
+    logger.info(f"Received batch code generation request for problem: {request.problem_id} with models: {request.models}")
+    validate_problem_id(request.problem_id)
+    try:
+        # Parse the problem once so the concurrent generations all hit the cache
+        await asyncio.to_thread(load_problem, request.problem_id)
+        return await asyncio.gather(*(
+            handle_code_generation(app.state.http, CodeGenerationRequest(
+                contestant_id=model.value,
+                model=model,
+                problem_id=request.problem_id,
+                leaderboard={}
+            ))
+            for model in request.models
+        ))
+    except Exception as e:
+        logger.error(f"Error in batch code generation endpoint: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def generate_once(generator: CodeGenerator, problem_id: str):
+    """Generate code, joining an identical generation that is already running."""
+    key = (generator.model_id, problem_id)
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.create_task(generator.agenerate_code(problem_id))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    else:
+        logger.info(f"Joining in-flight generation for {key}")
+    # Shield so one client disconnecting does not cancel the others' generation
+    return await asyncio.shield(task)
+
+async def handle_code_generation(client: httpx.AsyncClient, request: CodeGenerationRequest, emit: Optional[EmitFn] = None) -> CodeGenerationResponse:
     generator = CodeGenerator(model_id=request.model)
     
     try:
         # Generate code
         logger.info("Generating code...")
-        result = generator.generate_code(request.problem_id)
+        result = await generate_once(generator, request.problem_id)
         logger.info("Code generation completed")
-        logger.info(f"Code: {result.code}")
+        logger.debug("Code: %s", result.code)
+        if emit:
+            await emit("code", {"code_len": len(result.code)})
         
         # Submit code to localhost:8000 with retries
         logger.info("Submitting code...")
@@ -54,47 +190,53 @@ async def handle_code_generation(request: CodeGenerationRequest) -> CodeGenerati
         
         for attempt in range(max_retries):
             try:
-                async with httpx.AsyncClient(timeout=30.0) as client:
-                    response = await client.post(
-                        "http://localhost:8000/api/submit",
-                        json={
-                            "code": result.code,
-                            "problem_id": request.problem_id
-                        }
-                    )
+                response = await client.post(
+                    "/api/submit",
+                    json={
+                        "code": result.code,
+                        "problem_id": request.problem_id
+                    }
+                )
+                
+                if response.status_code == 200:
+                    result_dict = _json(response)
+                    submission_id = result_dict.get("submission_id")
+                    logger.info(f"Submission started with ID: {submission_id}")
+                    if emit:
+                        await emit("submitted", {"submission_id": submission_id})
                     
-                    if response.status_code == 200:
-                        submission_id = response.json().get("submission_id")
-                        logger.info(f"Submission started with ID: {submission_id}")
-                        
-                        # Wait for submission to complete
+                    # The verdict comes inline when the server already judged this code
+                    if result_dict.get("status", "QUEUED") in PENDING_STATUSES:
                         logger.info("Waiting for submission to complete...")
-                        result_dict = await wait_for_submission(client, submission_id)
-                        logger.info(f"Raw result: {result_dict}")
-                        
-                        # Convert dictionary to Verdict object
-                        verdict = Verdict(
-                            status=VerdictStatus(result_dict.get("status")),
-                            test_cases=result_dict.get("test_cases", []),
-                            error_message=result_dict.get("error_message")
-                        )
-                        
-                        logger.info(f"Submission completed with verdict: {verdict.status}")
-                        
-                        return CodeGenerationResponse(
-                            submission_id=submission_id,
-                            verdict=verdict
-                        )
-                    else:
-                        logger.error(f"Submission failed with status {response.status_code}: {response.text}")
-                        return CodeGenerationResponse(
-                            submission_id="",
-                            verdict=Verdict(
-                                status=VerdictStatus.OTHER,
-                                test_cases=[],
-                            ),
-                            error_message=f"Submission failed with status {response.status_code}: {response.text}"
-                        )
+                        on_status = status_emitter(emit, submission_id) if emit else None
+                        result_dict = await wait_for_submission(client, submission_id, on_status=on_status)
+                    logger.debug("Raw result: %s", result_dict)
+                    
+                    # Convert dictionary to Verdict object
+                    verdict = Verdict.model_validate(result_dict)
+                    
+                    logger.info(f"Submission completed with verdict: {verdict.status}")
+                    
+                    response = CodeGenerationResponse(
+                        submission_id=submission_id,
+                        verdict=verdict
+                    )
+                    return response
+                elif response.status_code == 503 and attempt < max_retries - 1:
+                    # The submission queue is full, back off and try again
+                    logger.warning(f"Submission server busy, retrying in {retry_delay} seconds... (attempt {attempt + 1}/{max_retries})")
+                    await asyncio.sleep(retry_delay)
+                    retry_delay *= 2  # Exponential backoff
+                else:
+                    logger.error(f"Submission failed with status {response.status_code}: {response.text}")
+                    return CodeGenerationResponse(
+                        submission_id="",
+                        verdict=Verdict(
+                            status=VerdictStatus.OTHER,
+                            test_cases=[],
+                        ),
+                        error_message=f"Submission failed with status {response.status_code}: {response.text}"
+                    )
             except httpx.ConnectTimeout:
                 if attempt < max_retries - 1:
                     logger.warning(f"Connection timeout, retrying in {retry_delay} seconds... (attempt {attempt + 1}/{max_retries})")
@@ -137,21 +279,43 @@ async def handle_code_generation(request: CodeGenerationRequest) -> CodeGenerati
             error_message=str(e)
         )
 
-async def wait_for_submission(client: httpx.AsyncClient, submission_id: str, max_retries: int = 60) -> dict:
-    """Wait for submission to complete by polling."""
-    logger.info(f"Waiting for submission {submission_id} to complete...")
-    for i in range(max_retries):
-        response = await client.get(f"http://localhost:8000/api/submit/{submission_id}")
+async def wait_for_submission(
+    client: httpx.AsyncClient,
+    submission_id: str,
+    timeout: float = 60.0,
+    on_status: Optional[Callable[[str], Awaitable[None]]] = None
+) -> dict:
+    """Wait for submission to complete by long polling.
+    
+    Args:
+        on_status: Awaited with the new status whenever it changes.
+    """
+    logger.debug("Waiting for submission %s to complete...", submission_id)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    delay = POLL_INITIAL_DELAY
+    attempt = 0
+    last_status = None
+    while (remaining := deadline - loop.time()) > 0:
+        attempt += 1
+        response = await client.get(
+            f"/api/submit/{submission_id}",
+            params={"wait": min(LONG_POLL_SECONDS, remaining)}
+        )
         if response.status_code == 200:
-            result = response.json()
-            if result.get("status") != "QUEUED" and result.get("status") != "PROCESSING":
-                logger.info(f"Submission {submission_id} completed with status: {result.get('status')}")
+            result = _json(response)
+            if on_status and result.get("status") != last_status:
+                last_status = result.get("status")
+                await on_status(last_status)
+            if result.get("status") not in PENDING_STATUSES:
+                logger.info("Submission %s completed with status: %s", submission_id, result.get("status"))
                 return result
-        if i % 10 == 0:  # Log every 10 attempts
-            logger.info(f"Still waiting for submission {submission_id}... (attempt {i+1}/{max_retries})")
-        await asyncio.sleep(1)
-    logger.error(f"Submission {submission_id} timed out after {max_retries} seconds")
-    raise TimeoutError("Submission timed out after 60 seconds")
+        if attempt % 10 == 1:  # Log every 10 attempts
+            logger.info("Still waiting for submission %s... (attempt %d)", submission_id, attempt)
+        await asyncio.sleep(delay)
+        delay = min(delay * 1.5, POLL_MAX_DELAY)  # Back off in case long polling is unavailable
+    logger.error("Submission %s timed out after %s seconds", submission_id, timeout)
+    raise TimeoutError(f"Submission timed out after {timeout:g} seconds")
 
 async def test_generation_and_submission():
     # Initialize code generator with desired provider
@@ -173,9 +337,9 @@ async def test_generation_and_submission():
         
         # Submit to our backend
         print("\nSubmitting code...")
-        async with httpx.AsyncClient() as client:
+        async with create_http_client() as client:
             response = await client.post(
-                "http://localhost:8000/api/submit",
+                "/api/submit",
                 json={
                     "code": result.code,
                     "problem_id": problem_id
@@ -183,7 +347,7 @@ async def test_generation_and_submission():
             )
             
             if response.status_code == 200:
-                submission_id = response.json().get("submission_id")
+                submission_id = _json(response).get("submission_id")
                 print(f"Submission started with ID: {submission_id}")
                 print("Waiting for submission to complete...")
                 
@@ -209,4 +373,4 @@ async def test_generation_and_submission():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8080) 
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8080, loop="uvloop", http="httptools") 
\ No newline at end of file
@@ -1,31 +1,40 @@
 import asyncio
 import logging
-import httpx
+from dotenv import load_dotenv
+
+# Load .env once, before importing modules that read the environment
+load_dotenv()
+
 from .generator import CodeGenerator
 from .dumb_generator import DumbCodeGenerator
+from .code_generator import create_http_client, LONG_POLL_SECONDS, POLL_INITIAL_DELAY, POLL_MAX_DELAY
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
-async def wait_for_submission(client, submission_id: str, max_retries: int = 60) -> dict:
-    """Wait for submission to complete by polling the API."""
-    logger.info(f"Waiting for submission {submission_id} to complete...")
-    for i in range(max_retries):
-        response = await client.get(f"http://localhost:8000/api/submit/{submission_id}")
+async def wait_for_submission(client, submission_id: str, timeout: float = 60.0) -> dict:
+    """Wait for submission to complete by long polling the API."""
+    logger.debug("Waiting for submission %s to complete...", submission_id)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    delay = POLL_INITIAL_DELAY
+    attempt = 0
+    while (remaining := deadline - loop.time()) > 0:
+        attempt += 1
+        response = await client.get(
+            f"/api/submit/{submission_id}",
+            params={"wait": min(LONG_POLL_SECONDS, remaining)}
+        )
         if response.status_code == 200:
             result = response.json()
             if result.get("status") != "QUEUED" and result.get("status") != "PROCESSING":
-                logger.info(f"Submission {submission_id} completed with status: {result.get('status')}")
+                logger.info("Submission %s completed with status: %s", submission_id, result.get("status"))
                 return result
-        if i % 10 == 0:  # Log every 10 attempts
-            logger.info(f"Still waiting for submission {submission_id}... (attempt {i+1}/{max_retries})")
-        await asyncio.sleep(1)
-    logger.error(f"Submission {submission_id} timed out after {max_retries} seconds")
-    raise TimeoutError("Submission timed out after 60 seconds")
+        if attempt % 10 == 1:  # Log every 10 attempts
+            logger.info("Still waiting for submission %s... (attempt %d)", submission_id, attempt)
+        await asyncio.sleep(delay)
+        delay = min(delay * 1.5, POLL_MAX_DELAY)  # Back off in case long polling is unavailable
+    logger.error("Submission %s timed out after %s seconds", submission_id, timeout)
+    raise TimeoutError(f"Submission timed out after {timeout:g} seconds")
 
 async def test_generation_and_submission():
     # Initialize code generator with desired provider
@@ -49,9 +58,9 @@ async def test_generation_and_submission():
         
         # Submit to our backend
         logger.info("Submitting code...")
-        async with httpx.AsyncClient() as client:
+        async with create_http_client() as client:
             response = await client.post(
-                "http://localhost:8000/api/submit",
+                "/api/submit",
                 json={
                     "code": result.code,
                     "problem_id": problem_id
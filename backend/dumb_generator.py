@@ -24,9 +24,12 @@ class DumbCodeGenerator:
 #include <vector>
 #include <numeric>
 #include <cmath>
+#include <bitset>
 
 using namespace std;
 
+const int MAX_SUM = 1 << 20;
+
 bool isPowerOfTwo(long long n) {
     return n > 0 && (n & (n - 1)) == 0;
 }
@@ -40,7 +43,27 @@ bool canDivide(vector<long long>& candies) {
     // We need to find a subset sum that is a power of 2
     long long half = total / 2;
     
-    // Find all possible subset sums using bitmask DP
+    if (total < MAX_SUM) {
+        // Find all possible subset sums with a bitset: each shift-or updates 64 sums per word
+        static bitset<MAX_SUM> possible;
+        possible.reset();
+        possible[0] = 1;
+        
+        for (long long candy : candies) {
+            possible |= possible << candy;
+        }
+        
+        // Check if there exists a subset sum that is a power of 2 and the remaining sum is also a power of 2
+        for (long long i = 1; i <= half; i <<= 1) {
+            if (possible[i] && isPowerOfTwo(total - i)) {
+                return true;
+            }
+        }
+        
+        return false;
+    }
+    
+    // Totals too large for the bitset: find all possible subset sums using bitmask DP
     vector<bool> possible(total + 1, false);
     possible[0] = true;
     
@@ -52,9 +75,8 @@ bool canDivide(vector<long long>& candies) {
         }
     }
     
-    // Check if there exists a subset sum that is a power of 2 and the remaining sum is also a power of 2
-    for (long long i = 1; i <= half; i++) {
-        if (possible[i] && isPowerOfTwo(i) && isPowerOfTwo(total - i)) {
+    for (long long i = 1; i <= half; i <<= 1) {
+        if (possible[i] && isPowerOfTwo(total - i)) {
             return true;
         }
     }
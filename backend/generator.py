@@ -1,64 +1,19 @@
+import asyncio
 import os
-from typing import Dict
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Optional, Tuple
 from langchain.prompts import ChatPromptTemplate
-from dotenv import load_dotenv
-import sys
 import logging
-from pathlib import Path
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
-# Add the parent directory to sys.path
-sys.path.append(str(Path(__file__).parent.parent))
-
 from .utils import read_pdf_content, read_limits
-from .providers import get_provider, CodeGenerationResponse
+from . import llm_cache
+from .providers import get_provider, get_llm_cached, CodeGenerationResponse
 from .dumb_generator import DumbCodeGenerator
 from .models import Verdict, CodeGenerationRequest, CodeGenerationResponse
-load_dotenv()
 
-class CodeGenerator:
-    def __init__(self, model_id: str = "o3-mini"):
-        logger.info(f"Initializing CodeGenerator with model: {model_id}")
-        self.model_id = model_id
-        self.provider = get_provider(model_id)
-        self.llm = self.provider.get_llm()
-        
-    def _read_problem_files(self, problem_id: str) -> Dict[str, str]:
-        logger.info(f"Reading problem files for: {problem_id}")
-        contest_name, problem_letter = problem_id.split("/")
-        base_path = os.path.join("Contests", contest_name)
-        problem_path = os.path.join(base_path, problem_letter)
-        
-        # Read problem statement from PDF
-        pdf_path = os.path.join(problem_path, "description", f"{problem_letter}.pdf")
-        if not os.path.exists(pdf_path):
-            logger.error(f"Problem statement PDF not found at {pdf_path}")
-            raise Exception(f"Problem statement PDF not found at {pdf_path}")
-        
-        logger.info("Reading problem statement and limits")
-        statement = read_pdf_content(pdf_path)
-        limits = read_limits(problem_path)
-        logger.info(f"Problem limits: {limits}")
-            
-        return {
-            "statement": statement,
-            "time_limit": limits.get("time_limit", 1),
-            "memory_limit": limits.get("memory_limit", 128)
-        }
-        
-    def generate_code(self, problem_id: str) -> CodeGenerationResponse:
-        logger.info(f"Generating code for problem: {problem_id}")
-        problem_data = self._read_problem_files(problem_id)
-        
-        logger.info("Creating prompt template")
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", """
+_SYSTEM_TEXT = """
             Dont add ```cpp or ``` at the beginning or end of the code.
             You are an expert competitive programmer. 
             Generate a C++  solution for the given problem.
@@ -86,12 +41,95 @@ class CodeGenerator:
             - Use the standard library #include<bits/stdc++.h>
 
             Time limit: {time_limit} seconds
-            Memory limit: {memory_limit} MB"""),
-            ("user", "Problem statement:\n{statement}")
-        ])
+            Memory limit: {memory_limit} MB"""
+
+_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", _SYSTEM_TEXT),
+    ("user", "Problem statement:\n{statement}")
+])
+
+_CHAIN_BY_MODEL: Dict[str, Any] = {}  # model_id -> prompt | llm
+
+@lru_cache(maxsize=1024)
+def _load_statement(pdf_path: str, mtime_ns: int, size: int) -> str:
+    """Parse the statement PDF of a problem.
+    
+    The PDF's mtime and size are part of the cache key, so editing the
+    statement invalidates the cached entry.
+    """
+    logger.info("Reading problem statement")
+    return read_pdf_content(pdf_path)
+
+def load_problem(problem_id: str) -> Dict[str, str]:
+    logger.info(f"Reading problem files for: {problem_id}")
+    contest_name, problem_letter = problem_id.split("/")
+    base_path = os.path.join("Contests", contest_name)
+    problem_path = os.path.join(base_path, problem_letter)
+    
+    # Read problem statement from PDF
+    pdf_path = os.path.join(problem_path, "description", f"{problem_letter}.pdf")
+    if not os.path.exists(pdf_path):
+        logger.error(f"Problem statement PDF not found at {pdf_path}")
+        raise Exception(f"Problem statement PDF not found at {pdf_path}")
+    
+    st = os.stat(pdf_path)
+    statement = _load_statement(pdf_path, st.st_mtime_ns, st.st_size)
+    # read_limits has its own mtime-keyed cache, so edits to limits/cpp are picked up
+    limits = read_limits(problem_path)
+    logger.info(f"Problem limits: {limits}")
+        
+    return {
+        "statement": statement,
+        "time_limit": limits.get("time_limit", 1),
+        "memory_limit": limits.get("memory_limit", 128)
+    }
+
+async def prefetch_problems(problem_ids: Iterable[str], concurrency: int = 4):
+    """Warm the problem cache in the background so requests skip PDF parsing."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def prefetch(problem_id: str):
+        async with semaphore:
+            try:
+                await asyncio.to_thread(load_problem, problem_id)
+            except Exception as e:
+                logger.warning(f"Could not prefetch problem {problem_id}: {str(e)}")
+
+    await asyncio.gather(*(prefetch(problem_id) for problem_id in problem_ids))
+
+class CodeGenerator:
+    def __init__(self, model_id: str = "o3-mini"):
+        logger.info(f"Initializing CodeGenerator with model: {model_id}")
+        self.model_id = model_id
+        self.provider = get_provider(model_id)
+        self.llm = get_llm_cached(model_id)
+        
+    def _read_problem_files(self, problem_id: str) -> Dict[str, str]:
+        return load_problem(problem_id)
+        
+    def _read_problem_and_cache(self, problem_id: str) -> Tuple[Dict[str, str], str, Optional[CodeGenerationResponse]]:
+        """Read the problem and look up a cached generation for it, both blocking I/O."""
+        problem_data = self._read_problem_files(problem_id)
+        cache_key = llm_cache.make_key(self.model_id, problem_id, problem_data["statement"])
+        return problem_data, cache_key, llm_cache.get_cached(cache_key)
+        
+    def _get_chain(self):
+        chain = _CHAIN_BY_MODEL.get(self.model_id)
+        if chain is None:
+            chain = _CHAIN_BY_MODEL[self.model_id] = _PROMPT | self.llm
+        return chain
+        
+    def generate_code(self, problem_id: str) -> CodeGenerationResponse:
+        logger.info(f"Generating code for problem: {problem_id}")
+        problem_data = self._read_problem_files(problem_id)
+        
+        cache_key = llm_cache.make_key(self.model_id, problem_id, problem_data["statement"])
+        cached = llm_cache.get_cached(cache_key)
+        if cached is not None:
+            return cached
         
         logger.info("Invoking LLM with prompt")
-        chain = prompt | self.llm
+        chain = self._get_chain()
         
         try:
             result = chain.invoke({
@@ -100,7 +138,32 @@ class CodeGenerator:
                 "memory_limit": problem_data["memory_limit"]
             })
             logger.info("Successfully generated code")
+            llm_cache.store(cache_key, result)
+            return result
+        except Exception as e:
+            logger.error(f"Error generating code: {str(e)}", exc_info=True)
+            raise
+        
+    async def agenerate_code(self, problem_id: str) -> CodeGenerationResponse:
+        """Async version of generate_code that does not block the event loop."""
+        logger.info(f"Generating code for problem: {problem_id}")
+        # diskcache does SQLite and file I/O, so the lookup runs off the event loop with the file reads
+        problem_data, cache_key, cached = await asyncio.to_thread(self._read_problem_and_cache, problem_id)
+        if cached is not None:
+            return cached
+        
+        logger.info("Invoking LLM with prompt")
+        chain = self._get_chain()
+        
+        try:
+            result = await chain.ainvoke({
+                "statement": problem_data["statement"],
+                "time_limit": problem_data["time_limit"],
+                "memory_limit": problem_data["memory_limit"]
+            })
+            logger.info("Successfully generated code")
+            await asyncio.to_thread(llm_cache.store, cache_key, result)
             return result
         except Exception as e:
             logger.error(f"Error generating code: {str(e)}", exc_info=True)
-            raise 
\ No newline at end of file
+            raise
\ No newline at end of file
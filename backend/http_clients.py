@@ -0,0 +1,9 @@
+import httpx
+
+# Shared by the LLM providers so TLS sessions and HTTP/2 connections to the
+# provider APIs are reused across generations instead of per client object.
+llm_async_client = httpx.AsyncClient(
+    http2=True,
+    limits=httpx.Limits(max_keepalive_connections=32),
+    timeout=httpx.Timeout(120.0, connect=5.0)
+)
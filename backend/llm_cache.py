@@ -0,0 +1,33 @@
+import hashlib
+import logging
+import os
+from typing import Optional
+from diskcache import Cache
+from .providers import CodeGenerationResponse
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.getenv("LLM_CACHE_DIR", os.path.join(".cache", "llm"))
+CACHE_EXPIRE = 7 * 86400  # One week, in seconds
+
+_cache = Cache(CACHE_DIR)
+
+def make_key(model_id: str, problem_id: str, statement: str) -> str:
+    """Build the cache key for a generation of `problem_id` by `model_id`.
+    
+    The statement is part of the key so an updated problem PDF is never
+    answered with code generated for the old statement.
+    """
+    model_id = getattr(model_id, "value", model_id)
+    statement_sha = hashlib.sha256(statement.encode("utf-8")).hexdigest()
+    return hashlib.blake2b(f"{model_id}|{problem_id}|{statement_sha}".encode("utf-8")).hexdigest()
+
+def get_cached(key: str) -> Optional[CodeGenerationResponse]:
+    data = _cache.get(key)
+    if data is None:
+        return None
+    logger.info(f"LLM cache hit: {key}")
+    return CodeGenerationResponse(**data)
+
+def store(key: str, result) -> None:
+    _cache.set(key, {"code": result.code, "explanation": result.explanation}, expire=CACHE_EXPIRE)
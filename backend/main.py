@@ -1,8 +1,17 @@
+from dotenv import load_dotenv
+from backend.logging_setup import setup_logging
+
+load_dotenv()
+
+# Configure logging
+setup_logging()
+
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from backend.routers import submissions, competitions
 
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 
 # Configure CORS
 app.add_middleware(
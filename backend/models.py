@@ -1,6 +1,6 @@
 from enum import Enum
 from typing import Optional, List, Dict, Union
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, field_validator
 
 class ModelType(str, Enum):
     O3_MINI = "o3-mini"
@@ -25,53 +25,57 @@ class VerdictStatus(str, Enum):
     OTHER = "OTHER"
 
 class TestCaseResult(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     test_case: str
     expected_output: str
     actual_output: str
     verdict: VerdictStatus
 
-    def __init__(self, **data):
-        super().__init__(**data)
-        self.test_case = self.test_case[:60] + "..." if len(self.test_case) > 60 else self.test_case
-        self.expected_output = self.expected_output[:60] + "..." if len(self.expected_output) > 60 else self.expected_output
-        self.actual_output = self.actual_output[:60] + "..." if len(self.actual_output) > 60 else self.actual_output
+    @field_validator("test_case", "expected_output", "actual_output")
+    @classmethod
+    def truncate(cls, value: str) -> str:
+        if len(value) > 60:
+            return value[:60] + "..."
+        return value
 
 class Verdict(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     status: VerdictStatus
     test_cases: List[TestCaseResult]
     error_message: Optional[str] = None
 
+    @staticmethod
+    def status_from_judge0(status_id: int) -> VerdictStatus:
+        return _JUDGE0_STATUS_MAP.get(status_id, VerdictStatus.OTHER)
+
     @classmethod
     def from_judge0_status(cls, status_id: int, test_cases: List[TestCaseResult] = None, error_message: str = None) -> 'Verdict':
-        if test_cases is None:
-            test_cases = []
-            
-        if status_id in [1, 2]:  # In Queue or Processing
-            return cls(status=VerdictStatus.QUEUED, test_cases=test_cases)
-        elif status_id == 3:  # Accepted
-            return cls(status=VerdictStatus.ACCEPTED, test_cases=test_cases)
-        elif status_id == 4:  # Wrong Answer
-            return cls(status=VerdictStatus.WRONG_ANSWER, test_cases=test_cases)
-        elif status_id == 5:  # Time Limit Exceeded
-            return cls(status=VerdictStatus.TIME_LIMIT, test_cases=test_cases)
-        elif status_id == 6:  # Compilation Error
-            return cls(status=VerdictStatus.COMPILATION_ERROR, test_cases=test_cases, error_message=error_message)
-        elif status_id == 7:  # Runtime Error (SIGSEGV)
-            return cls(status=VerdictStatus.RUNTIME_ERROR_SIGSEGV, test_cases=test_cases)
-        elif status_id == 8:  # Runtime Error (SIGXFSZ)
-            return cls(status=VerdictStatus.RUNTIME_ERROR_SIGXFSZ, test_cases=test_cases)
-        elif status_id == 9:  # Runtime Error (SIGFPE)
-            return cls(status=VerdictStatus.RUNTIME_ERROR_SIGFPE, test_cases=test_cases)
-        elif status_id == 10:  # Runtime Error (SIGABRT)
-            return cls(status=VerdictStatus.RUNTIME_ERROR_SIGABRT, test_cases=test_cases)
-        elif status_id == 11:  # Runtime Error (NZEC)
-            return cls(status=VerdictStatus.RUNTIME_ERROR_NZEC, test_cases=test_cases)
-        elif status_id == 12:  # Runtime Error (Other)
-            return cls(status=VerdictStatus.RUNTIME_ERROR_OTHER, test_cases=test_cases)
-        elif status_id == 17:  # Memory Limit Exceeded
-            return cls(status=VerdictStatus.MEMORY_LIMIT, test_cases=test_cases)
-        else:
-            return cls(status=VerdictStatus.OTHER, test_cases=test_cases, error_message=error_message)
+        status = cls.status_from_judge0(status_id)
+        return cls(
+            status=status,
+            test_cases=test_cases or [],
+            error_message=error_message if status in _STATUSES_WITH_ERROR_MESSAGE else None
+        )
+
+_JUDGE0_STATUS_MAP = {
+    1: VerdictStatus.QUEUED,  # In Queue
+    2: VerdictStatus.QUEUED,  # Processing
+    3: VerdictStatus.ACCEPTED,
+    4: VerdictStatus.WRONG_ANSWER,
+    5: VerdictStatus.TIME_LIMIT,
+    6: VerdictStatus.COMPILATION_ERROR,
+    7: VerdictStatus.RUNTIME_ERROR_SIGSEGV,
+    8: VerdictStatus.RUNTIME_ERROR_SIGXFSZ,
+    9: VerdictStatus.RUNTIME_ERROR_SIGFPE,
+    10: VerdictStatus.RUNTIME_ERROR_SIGABRT,
+    11: VerdictStatus.RUNTIME_ERROR_NZEC,
+    12: VerdictStatus.RUNTIME_ERROR_OTHER,
+    17: VerdictStatus.MEMORY_LIMIT,
+}
+
+_STATUSES_WITH_ERROR_MESSAGE = frozenset({VerdictStatus.COMPILATION_ERROR, VerdictStatus.OTHER})
 
 class CodeGenerationRequest(BaseModel):
     contestant_id: str
@@ -79,6 +83,10 @@ class CodeGenerationRequest(BaseModel):
     problem_id: str
     leaderboard: Dict[str, Dict[str, Union[str, int]]]
 
+class CodeGenerationBatchRequest(BaseModel):
+    problem_id: str
+    models: List[ModelType]
+
 class CodeGenerationResponse(BaseModel):
     submission_id: str
     verdict: Verdict 
@@ -1,10 +1,12 @@
 from abc import ABC, abstractmethod
+from functools import lru_cache
 from typing import Dict
 from langchain_openai import ChatOpenAI
 from langchain_anthropic import ChatAnthropic
 from langchain_google_genai import ChatGoogleGenerativeAI
 from pydantic import BaseModel, Field
 import os
+from .http_clients import llm_async_client
 
 class CodeGenerationResponse(BaseModel):
     code: str = Field(description="The generated C++ solution")
@@ -22,7 +24,8 @@ class OpenAIProvider(LLMProvider):
     def get_llm(self):
         return ChatOpenAI(
             model_name=self.model_name,
-            openai_api_key=os.getenv("OPENAI_API_KEY")
+            openai_api_key=os.getenv("OPENAI_API_KEY"),
+            http_async_client=llm_async_client
         ).with_structured_output(CodeGenerationResponse)
 
 class AnthropicProvider(LLMProvider):
@@ -53,6 +56,7 @@ class DumbProvider(LLMProvider):
     def get_llm(self):
         return self.generator
 
+@lru_cache(maxsize=8)
 def get_provider(model_id: str) -> LLMProvider:
     model_to_provider = {
         "o3-mini": lambda: OpenAIProvider("o3-mini"),
@@ -64,4 +68,9 @@ def get_provider(model_id: str) -> LLMProvider:
     if model_id not in model_to_provider:
         raise ValueError(f"Unknown model: {model_id}. Available models: {list(model_to_provider.keys())}")
         
-    return model_to_provider[model_id]() 
\ No newline at end of file
+    return model_to_provider[model_id]()
+
+@lru_cache(maxsize=8)
+def get_llm_cached(model_id: str):
+    """Return the structured-output LLM for a model, built once per process."""
+    return get_provider(model_id).get_llm()
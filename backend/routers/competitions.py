@@ -2,17 +2,18 @@ from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
 from typing import List
 import logging
-from backend.utils import get_random_problems
+from backend.utils import get_random_problems, load_problem_info
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+@router.on_event("startup")
+async def startup_event():
+    """Read the problem pool's metadata once, so /problems does no I/O."""
+    problem_info = load_problem_info()
+    logger.info(f"Loaded info for {len(problem_info)} problems")
+
 class ProblemInfo(BaseModel):
     problem_id: str
     name: str
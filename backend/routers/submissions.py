@@ -1,19 +1,20 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request
 from pydantic import BaseModel
 import os
 import httpx
 import traceback
 import logging
 import asyncio
-from typing import Dict, List, Optional
-from backend.utils import read_limits, get_test_cases
+import hashlib
+import uuid
+from collections import OrderedDict
+from cachetools import TTLCache
+from typing import Dict, List, Optional, Tuple
+from backend.utils import aread_limits, aget_test_cases, problem_fingerprint
 from backend.models import Verdict, VerdictStatus, TestCaseResult
+from backend import submission_store
 import base64
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+import orjson
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
@@ -24,108 +25,255 @@ class SubmissionRequest(BaseModel):
 
 class SubmissionResponse(BaseModel):
     submission_id: str
+    # Filled in when the verdict is already known at submit time (cached)
+    status: VerdictStatus = VerdictStatus.QUEUED
+    test_cases: List[TestCaseResult] = []
+    error_message: Optional[str] = None
 
-# Store active submissions and queues
-active_submissions = {}
-submission_queue = asyncio.Queue()
-MAX_WORKERS = 8  # Maximum number of concurrent submissions
+# Store active submissions and queues. Entries expire an hour after they were last written,
+# well past the point any client is still polling for them
+active_submissions: "TTLCache[str, dict]" = TTLCache(maxsize=10_000, ttl=3600)
+completion_events: Dict[str, asyncio.Event] = {}  # Set once a submission reaches a final state
+MAX_WORKERS = int(os.getenv("MAX_WORKERS", "8"))  # Maximum number of concurrent submissions
+# Bounded so a burst can't pile up unbounded work; /submit answers 503 when it stays full
+submission_queue: asyncio.Queue = asyncio.Queue(maxsize=int(os.getenv("SUBMISSION_QUEUE_SIZE", str(MAX_WORKERS * 4))))
+SUBMISSION_QUEUE_PUT_TIMEOUT = 5  # seconds
 worker_tasks: List[asyncio.Task] = []
+shutdown_evt = asyncio.Event()  # Set on shutdown; workers exit once the queue is drained
+SHUTDOWN_GRACE_SECONDS = 30  # How long shutdown waits for queued submissions before cancelling
+judge0_client: Optional[httpx.AsyncClient] = None  # Shared connection pool, created on startup
 
-def clean_code_for_utf8(code: str) -> str:
-    """Clean code to ensure it's UTF-8 compatible."""
-    # Remove any non-printable characters
-    code = ''.join(char for char in code if char.isprintable() or char in '\n\t')
-    # Replace any remaining invalid characters with spaces
-    return code.encode('utf-8', errors='replace').decode('utf-8')
-
-async def run_test_case(client: httpx.AsyncClient, code: str, input_data: str, expected_output: str, limits: dict, test_num: int) -> TestCaseResult:
-    """Run a single test case and return the result."""
-    memory_limit_kb = limits.get("memory_limit", 128) * 1000
-    memory_limit_kb = min(memory_limit_kb, 512 * 1000)
-
-    # Clean and ensure UTF-8 compatibility
-    code = clean_code_for_utf8(code)
-    input_data = clean_code_for_utf8(input_data) if input_data else ""
-    expected_output = clean_code_for_utf8(expected_output) if expected_output else ""
-
-    judge0_submission = {
-        "source_code": code,
-        "language_id": 54,  # C++ (GCC 9.2.0)
-        "cpu_time_limit": int(limits.get("time_limit", 1)),  
-        "memory_limit": memory_limit_kb,  
-        "stdin": input_data,
-        "expected_output": expected_output
-    }
-    
-    headers = {
-        "Content-Type": "application/json",
-        "Accept": "application/json"
-    }
-    
-    response = await client.post(
-        "http://localhost:2358/submissions",
-        json=judge0_submission,
-        headers=headers
-    )
-    
-    if response.status_code != 201:
-        logger.error(f"Judge0 submission failed: {response.text}")
-        return TestCaseResult(
-            test_case=input_data,
-            expected_output=expected_output,
-            actual_output="",
-            verdict=VerdictStatus.OTHER
-        )
-    
-    submission_token = response.json()["token"]
-    result = await wait_for_submission(client, submission_token)
+# When set, Judge0 PUTs finished submissions to {JUDGE0_CALLBACK_URL}/{callback_id}
+# instead of being polled, e.g. http://host.docker.internal:8000/api/judge0/callback
+JUDGE0_CALLBACK_URL = os.getenv("JUDGE0_CALLBACK_URL", "").rstrip("/")
+JUDGE0_CALLBACK_TIMEOUT = float(os.getenv("JUDGE0_CALLBACK_TIMEOUT", "30"))  # seconds, then fall back to polling
+pending_callbacks: Dict[str, Tuple[asyncio.Event, dict]] = {}
+callback_listener_task: Optional[asyncio.Task] = None  # Receives callbacks forwarded through Redis
+
+# Only what build_test_case_result reads, so polls don't echo back source code and test data
+JUDGE0_POLL_FIELDS = "token,status,stdout"
+JUDGE0_FINAL_STATUSES = frozenset(range(3, 15))  # Accepted through Exec Format Error
+JUDGE0_BATCH_SIZE = 20  # Judge0's default MAX_SUBMISSION_BATCH_SIZE
+# Batches in flight to Judge0 at once, across submissions; match it to Judge0's worker count
+JUDGE0_MAX_CONCURRENT_BATCHES = int(os.getenv("JUDGE0_MAX_CONCURRENT_BATCHES", "4"))
+judge0_semaphore = asyncio.Semaphore(JUDGE0_MAX_CONCURRENT_BATCHES)
+
+# Results of already judged (limits, code, input, expected_output) test cases, least recently used first
+test_case_cache: "OrderedDict[bytes, TestCaseResult]" = OrderedDict()
+MAX_CACHED_TEST_CASES = 10_000
+
+# Final verdicts of already judged (problem, test data, code) triples, least recently used first
+verdict_cache: "OrderedDict[str, Verdict]" = OrderedDict()
+MAX_CACHED_VERDICTS = 1000
+
+async def save_submission(submission_id: str, entry: dict):
+    """Store the state of a submission, mirroring it to Redis when configured."""
+    active_submissions[submission_id] = entry
+    await submission_store.save(submission_id, entry)
+
+async def finish_submission(submission_id: str, entry: dict):
+    """Store the final state of a submission and wake up any long-polling clients."""
+    await save_submission(submission_id, entry)
+    event = completion_events.pop(submission_id, None)
+    if event is not None:
+        event.set()
+
+def verdict_cache_key(problem_id: str, code: str) -> str:
+    # The fingerprint keeps edited test data or limits from being answered with an old verdict
+    fingerprint = problem_fingerprint(os.path.join("Contests", problem_id))
+    return hashlib.blake2b(f"{problem_id}\0{fingerprint}\0{code}".encode("utf-8"), digest_size=16).hexdigest()
+
+async def complete_submission(submission_id: str, cache_key: str, verdict: Verdict):
+    """Finish a judged submission and remember its verdict for identical resubmissions."""
+    await finish_submission(submission_id, {
+        "status": "COMPLETED",
+        "verdict": verdict
+    })
+    # OTHER usually means Judge0 itself failed, which is worth retrying
+    if verdict.status != VerdictStatus.OTHER:
+        verdict_cache[cache_key] = verdict
+        verdict_cache.move_to_end(cache_key)
+        if len(verdict_cache) > MAX_CACHED_VERDICTS:
+            verdict_cache.popitem(last=False)
+
+def b64encode(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii")
+
+def b64decode_text(data: Optional[str]) -> str:
+    return base64.b64decode(data or "").decode("utf-8", errors="replace")
+
+def as_text(data: bytes) -> str:
+    """Decode test case bytes for display."""
+    return data.decode("utf-8", errors="replace")
 
+def build_test_case_result(input_data: bytes, expected_output: bytes, result: dict, test_num: int) -> TestCaseResult:
+    """Turn a finished Judge0 submission into a TestCaseResult."""
     status_id = result.get("status", {}).get("id")
-    actual_output = result.get("stdout", "")
-    error_message = result.get("stderr", "")
+    actual_output = b64decode_text(result.get("stdout"))
 
-    logger.info(f"verdict: {Verdict.from_judge0_status(status_id).status}")
-    logger.info(f"status_id: {status_id}")
-    logger.info(f"test_case: {test_num}")
+    verdict = Verdict.status_from_judge0(status_id)
 
-    if Verdict.from_judge0_status(status_id).status == VerdictStatus.ACCEPTED:
+    logger.info(
+        "test_case: %d, status_id: %s, verdict: %s", test_num, status_id, verdict.value,
+        extra={"test_case": test_num, "status_id": status_id, "verdict": verdict.value}
+    )
+
+    if verdict == VerdictStatus.ACCEPTED:
         return TestCaseResult(
-            test_case=input_data,
-            expected_output=expected_output,
+            test_case=as_text(input_data),
+            expected_output=as_text(expected_output),
             actual_output=actual_output,
-            verdict=Verdict.from_judge0_status(status_id).status
+            verdict=verdict
         )
     
     return TestCaseResult(
-        test_case=input_data,
+        test_case=as_text(input_data),
         expected_output="a",
         actual_output="a",
-        verdict=Verdict.from_judge0_status(status_id).status
+        verdict=verdict
     )
 
-async def wait_for_submission(client: httpx.AsyncClient, token: str, max_retries: int = 200) -> dict:
-    """Wait for submission to complete by polling Judge0 API."""
+def payload_digest(base_payload: dict) -> "hashlib.blake2b":
+    """Hash the parts of a Judge0 submission shared by all test cases."""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (base_payload["cpu_time_limit"], base_payload["memory_limit"], base_payload["source_code"]):
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\0")
+    return digest
+
+def test_case_cache_key(base_digest: "hashlib.blake2b", input_data: bytes, expected_output: bytes) -> bytes:
+    digest = base_digest.copy()
+    digest.update(input_data)
+    digest.update(b"\0")
+    digest.update(expected_output)
+    return digest.digest()
+
+async def run_test_cases(client: httpx.AsyncClient, base_payload: dict, test_cases: List[Tuple[int, bytes, bytes]]) -> List[TestCaseResult]:
+    """Run (test_num, input, expected_output) test cases as one Judge0 batch, in order.
+    
+    Test cases already judged with the same code and limits are answered from cache.
+    """
+    base_digest = payload_digest(base_payload)
+    cache_keys = [
+        test_case_cache_key(base_digest, input_data, expected_output)
+        for _, input_data, expected_output in test_cases
+    ]
+    cached_results = [test_case_cache.get(key) for key in cache_keys]
+    # Refresh hits now, since other batches may evict entries while this one waits on Judge0
+    for key, cached in zip(cache_keys, cached_results):
+        if cached is not None:
+            test_case_cache.move_to_end(key)
+    to_judge = [case for case, cached in zip(test_cases, cached_results) if cached is None]
+    judged = iter(await judge_test_cases(client, base_payload, to_judge) if to_judge else [])
+
+    results = []
+    for key, result in zip(cache_keys, cached_results):
+        if result is None:
+            result = next(judged)
+            # OTHER usually means Judge0 itself failed, which is worth retrying
+            if result.verdict != VerdictStatus.OTHER:
+                test_case_cache[key] = result
+                if len(test_case_cache) > MAX_CACHED_TEST_CASES:
+                    test_case_cache.popitem(last=False)
+        results.append(result)
+    return results
+
+async def judge_test_cases(client: httpx.AsyncClient, base_payload: dict, test_cases: List[Tuple[int, bytes, bytes]]) -> List[TestCaseResult]:
+    """Submit test cases to Judge0 as one batch and wait for their results."""
+    judge0_submissions = []
+    callback_ids = []
+    for _, input_data, expected_output in test_cases:
+        judge0_submission = {
+            **base_payload,
+            "stdin": b64encode(input_data),
+            "expected_output": b64encode(expected_output)
+        }
+        # Register the callback before submitting, since Judge0 may finish before the POST returns
+        if JUDGE0_CALLBACK_URL:
+            callback_id = uuid.uuid4().hex
+            pending_callbacks[callback_id] = (asyncio.Event(), {})
+            judge0_submission["callback_url"] = f"{JUDGE0_CALLBACK_URL}/{callback_id}"
+            callback_ids.append(callback_id)
+        judge0_submissions.append(judge0_submission)
+    
+    try:
+        async with judge0_semaphore:
+            response = await client.post(
+                "/submissions/batch",
+                params={"base64_encoded": "true"},
+                content=orjson.dumps({"submissions": judge0_submissions})
+            )
+            
+            if response.status_code != 201:
+                logger.error(f"Judge0 submission failed: {response.text}")
+                return [
+                    TestCaseResult(
+                        test_case=as_text(input_data),
+                        expected_output=as_text(expected_output),
+                        actual_output="",
+                        verdict=VerdictStatus.OTHER
+                    )
+                    for _, input_data, expected_output in test_cases
+                ]
+            
+            # Rejected submissions come back without a token
+            tokens = [item.get("token") for item in orjson.loads(response.content)]
+            results = await wait_for_results(client, tokens, callback_ids)
+    finally:
+        for callback_id in callback_ids:
+            pending_callbacks.pop(callback_id, None)
+
+    return [
+        build_test_case_result(input_data, expected_output, result, test_num)
+        for (test_num, input_data, expected_output), result in zip(test_cases, results)
+    ]
+
+async def wait_for_results(client: httpx.AsyncClient, tokens: List[Optional[str]], callback_ids: List[str]) -> List[dict]:
+    """Wait for Judge0's callbacks, polling for any that never arrive."""
+    results: List[Optional[dict]] = [None] * len(tokens)
+    if callback_ids:
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(pending_callbacks[callback_id][0].wait() for callback_id in callback_ids)),
+                timeout=JUDGE0_CALLBACK_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            logger.warning("Missing Judge0 callbacks, falling back to polling")
+        for i, callback_id in enumerate(callback_ids):
+            event, result = pending_callbacks[callback_id]
+            if event.is_set():
+                results[i] = result
+    
+    missing = [token for token, result in zip(tokens, results) if result is None and token]
+    polled = await wait_for_submissions(client, missing) if missing else {}
+    # Internal error (status id 13) for submissions Judge0 rejected
+    return [result or polled.get(token) or {"status": {"id": 13}} for token, result in zip(tokens, results)]
+
+async def wait_for_submissions(client: httpx.AsyncClient, tokens: List[str], max_retries: int = 200) -> Dict[str, dict]:
+    """Wait for submissions to complete by polling Judge0's batch API."""
+    results: Dict[str, dict] = {}
     for _ in range(max_retries):
+        remaining = [token for token in tokens if token not in results]
         response = await client.get(
-            f"http://localhost:2358/submissions/{token}",
-            headers={"Accept": "application/json"}
+            "/submissions/batch",
+            params={"tokens": ",".join(remaining), "base64_encoded": "true", "fields": JUDGE0_POLL_FIELDS}
         )
         if response.status_code != 200:
             logger.error(f"Failed to get submission status: {response.text}")
 
             # return with status id 13
             return {
-                "status": {
-                    "id": 13
-                }
+                **results,
+                **{token: {"status": {"id": 13}} for token in remaining}
             }
-            
         
-        result = response.json()
-        status_id = result.get("status", {}).get("id")
+        for result in orjson.loads(response.content).get("submissions", []):
+            status_id = result.get("status", {}).get("id")
+            if status_id in JUDGE0_FINAL_STATUSES:
+                results[result["token"]] = result
         
-        if status_id in [3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14]:  # Final states
-            return result
+        if len(results) == len(tokens):
+            return results
             
         await asyncio.sleep(0.5)
     
@@ -135,107 +283,172 @@ async def wait_for_submission(client: httpx.AsyncClient, token: str, max_retries
     )
 
 async def worker(worker_id: int):
-    """Worker process to handle submissions from the queue."""
+    """Worker process to handle submissions from the queue.
+    
+    Drains the queue and exits once shutdown_evt is set and the queue is empty.
+    """
     logger.info(f"Worker {worker_id} started")
     while True:
         try:
             # Get next submission from queue
-            submission_id, code, problem_id = await submission_queue.get()
-            logger.info(f"Worker {worker_id} processing submission {submission_id}")
-            
-            try:
-                # Process the submission
-                await process_submission(submission_id, code, problem_id)
-            except Exception as e:
-                logger.error(f"Worker {worker_id} error processing submission {submission_id}: {str(e)}", exc_info=True)
-                active_submissions[submission_id] = {
-                    "status": "ERROR",
-                    "error": str(e)
-                }
-            finally:
-                submission_queue.task_done()
-                
+            submission_id, code, problem_id = await asyncio.wait_for(submission_queue.get(), timeout=1)
+        except asyncio.TimeoutError:
+            if shutdown_evt.is_set():
+                break
+            continue
+        logger.info(f"Worker {worker_id} processing submission {submission_id}")
+        
+        try:
+            # Process the submission
+            await process_submission(submission_id, code, problem_id)
         except Exception as e:
-            logger.error(f"Worker {worker_id} error: {str(e)}", exc_info=True)
-            await asyncio.sleep(1)  # Prevent tight loop on error
+            logger.error(f"Worker {worker_id} error processing submission {submission_id}: {str(e)}", exc_info=True)
+            await finish_submission(submission_id, {
+                "status": "ERROR",
+                "error": str(e)
+            })
+        finally:
+            submission_queue.task_done()
+    logger.info(f"Worker {worker_id} stopped")
 
 async def process_submission(submission_id: str, code: str, problem_id: str):
     """Process a submission in the background."""
     try:
-        active_submissions[submission_id]["status"] = "PROCESSING"
+        await save_submission(submission_id, {
+            "status": "PROCESSING",
+            "problem_id": problem_id
+        })
+        cache_key = verdict_cache_key(problem_id, code)
         
         contest_name, problem_letter = problem_id.split("/")
         base_path = os.path.join("Contests", contest_name)
         problem_path = os.path.join(base_path, problem_letter)
         
         # Read limits and test cases
-        limits = read_limits(problem_path)
-        test_cases = get_test_cases(problem_path)
+        limits, test_cases = await asyncio.gather(
+            aread_limits(problem_path),
+            aget_test_cases(problem_path)
+        )
         
         if not test_cases:
-            active_submissions[submission_id] = {
-                "status": "COMPLETED",
-                "verdict": Verdict(
-                    status=VerdictStatus.OTHER,
-                    test_cases=[],
-                    error_message="No test cases found"
-                )
-            }
+            await complete_submission(submission_id, cache_key, Verdict(
+                status=VerdictStatus.OTHER,
+                test_cases=[],
+                error_message="No test cases found"
+            ))
             return
         
-        # Run test cases
-        async with httpx.AsyncClient() as client:
-            test_num = 1
-            for input_data, expected_output in test_cases:
-                result = await run_test_case(
-                    client,
-                    code,
-                    input_data,
-                    expected_output,
-                    limits,
-                    test_num
-                )
-                test_num += 1
-                if result.verdict != VerdictStatus.ACCEPTED:
-                    active_submissions[submission_id] = {
-                        "status": "COMPLETED",
-                        "verdict": Verdict(
-                            status=result.verdict,
-                            test_cases=[result]
-                        )
-                    }
+        # Invariant part of every Judge0 submission, built once
+        memory_limit_kb = limits.get("memory_limit", 128) * 1000
+        memory_limit_kb = min(memory_limit_kb, 512 * 1000)
+        base_payload = {
+            "source_code": b64encode(code.encode("utf-8")),
+            "language_id": 54,  # C++ (GCC 9.2.0)
+            "cpu_time_limit": int(limits.get("time_limit", 1)),
+            "memory_limit": memory_limit_kb
+        }
+        
+        # Run Judge0 batches concurrently, stopping at the first failing one
+        numbered_cases = [
+            (test_num, input_data, expected_output)
+            for test_num, (input_data, expected_output) in enumerate(test_cases, 1)
+        ]
+        tasks = [
+            asyncio.create_task(run_test_cases(
+                judge0_client,
+                base_payload,
+                numbered_cases[start:start + JUDGE0_BATCH_SIZE]
+            ))
+            for start in range(0, len(numbered_cases), JUDGE0_BATCH_SIZE)
+        ]
+        try:
+            for next_batch in asyncio.as_completed(tasks):
+                results = await next_batch
+                failed = next((result for result in results if result.verdict != VerdictStatus.ACCEPTED), None)
+                if failed is not None:
+                    await complete_submission(submission_id, cache_key, Verdict(
+                        status=failed.verdict,
+                        test_cases=[failed]
+                    ))
                     return
+        finally:
+            # Stop waiting on batches whose outcome no longer matters
+            for task in tasks:
+                task.cancel()
         
         # If we get here, all tests passed
-        active_submissions[submission_id] = {
-            "status": "COMPLETED",
-            "verdict": Verdict(
-                status=VerdictStatus.ACCEPTED,
-                test_cases=[]
-            )
-        }
+        await complete_submission(submission_id, cache_key, Verdict(
+            status=VerdictStatus.ACCEPTED,
+            test_cases=[]
+        ))
         
     except Exception as e:
         logger.error(f"Error processing submission {submission_id}: {str(e)}")
-        active_submissions[submission_id] = {
+        await finish_submission(submission_id, {
             "status": "ERROR",
             "error": str(e)
-        }
+        })
 
 @router.on_event("startup")
 async def startup_event():
-    """Start worker tasks on startup."""
-    global worker_tasks
+    """Create the Judge0 client and start worker tasks on startup."""
+    global worker_tasks, judge0_client, callback_listener_task
+    shutdown_evt.clear()
+    await submission_store.connect()
+    if JUDGE0_CALLBACK_URL:
+        if submission_store.enabled():
+            # Judge0 may PUT a callback to any worker process; forward it to the one waiting on it
+            callback_listener_task = asyncio.create_task(submission_store.listen_for_callbacks(deliver_callback))
+        else:
+            logger.warning(
+                "JUDGE0_CALLBACK_URL without REDIS_URL needs a single server process, "
+                "since a callback reaching another process is dropped"
+            )
+    judge0_client = httpx.AsyncClient(
+        base_url="http://localhost:2358",
+        limits=httpx.Limits(max_connections=MAX_WORKERS * 8, max_keepalive_connections=MAX_WORKERS * 4),
+        headers={"Accept": "application/json", "Content-Type": "application/json"}
+    )
     for i in range(MAX_WORKERS):
         task = asyncio.create_task(worker(i))
         worker_tasks.append(task)
 
 @router.on_event("shutdown")
 async def shutdown_event():
-    """Cancel worker tasks on shutdown."""
-    for task in worker_tasks:
-        task.cancel()
-    await asyncio.gather(*worker_tasks, return_exceptions=True)
+    """Let workers drain the queue, then stop them and close the Judge0 client."""
+    shutdown_evt.set()
+    if worker_tasks:
+        _, still_running = await asyncio.wait(worker_tasks, timeout=SHUTDOWN_GRACE_SECONDS)
+        for task in still_running:
+            task.cancel()
+        await asyncio.gather(*still_running, return_exceptions=True)
+    worker_tasks.clear()
+    if callback_listener_task is not None:
+        callback_listener_task.cancel()
+        await asyncio.gather(callback_listener_task, return_exceptions=True)
+    await judge0_client.aclose()
+    await submission_store.close()
+
+def deliver_callback(callback_id: str, body: bytes) -> bool:
+    """Wake up the batch waiting on this callback, if it belongs to this process."""
+    pending = pending_callbacks.get(callback_id)
+    if pending is None:
+        return False
+    event, result = pending
+    result.update(orjson.loads(body))
+    event.set()
+    return True
+
+@router.put("/judge0/callback/{callback_id}")
+async def judge0_callback(callback_id: str, request: Request):
+    """Receive a finished submission from Judge0."""
+    body = await request.body()
+    if deliver_callback(callback_id, body):
+        return {}
+    # Submitted by another worker process
+    if await submission_store.forward_callback(callback_id, body):
+        return {}
+    raise HTTPException(status_code=404, detail="Unknown callback")
 
 @router.post("/submit")
 async def submit_code(submission: SubmissionRequest):
@@ -243,21 +456,54 @@ async def submit_code(submission: SubmissionRequest):
         logger.info(f"Received submission for problem: {submission.problem_id}")
         
         # Generate a unique submission ID
-        import uuid
         submission_id = str(uuid.uuid4())
         
+        # Identical code for the same problem was already judged
+        cache_key = verdict_cache_key(submission.problem_id, submission.code)
+        verdict = verdict_cache.get(cache_key)
+        if verdict is not None:
+            verdict_cache.move_to_end(cache_key)
+            logger.info(f"Serving cached verdict for submission {submission_id}")
+            await save_submission(submission_id, {
+                "status": "COMPLETED",
+                "problem_id": submission.problem_id,
+                "verdict": verdict
+            })
+            return SubmissionResponse(
+                submission_id=submission_id,
+                status=verdict.status,
+                test_cases=verdict.test_cases,
+                error_message=verdict.error_message
+            )
+        
         # Store submission info
-        active_submissions[submission_id] = {
+        await save_submission(submission_id, {
             "status": "QUEUED",
-            "problem_id": submission.problem_id,
-            "code": submission.code
-        }
+            "problem_id": submission.problem_id
+        })
+        completion_events[submission_id] = asyncio.Event()
         
         # Add to queue for processing
-        await submission_queue.put((submission_id, submission.code, submission.problem_id))
+        try:
+            await asyncio.wait_for(
+                submission_queue.put((submission_id, submission.code, submission.problem_id)),
+                timeout=SUBMISSION_QUEUE_PUT_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"Submission queue full, rejecting submission {submission_id}")
+            active_submissions.pop(submission_id, None)
+            completion_events.pop(submission_id, None)
+            await submission_store.discard(submission_id)
+            raise HTTPException(
+                status_code=503,
+                detail="Too many pending submissions, try again later",
+                headers={"Retry-After": str(SUBMISSION_QUEUE_PUT_TIMEOUT)}
+            )
         
         return SubmissionResponse(submission_id=submission_id)
             
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Unexpected error: {str(e)}")
         logger.error(f"Traceback: {traceback.format_exc()}")
@@ -267,12 +513,29 @@ async def submit_code(submission: SubmissionRequest):
         )
 
 @router.get("/submit/{submission_id}")
-async def get_submission_status(submission_id: str):
-    """Get the status of a submission."""
-    if submission_id not in active_submissions:
-        raise HTTPException(status_code=404, detail="Submission not found")
+async def get_submission_status(submission_id: str, wait: float = Query(default=0, ge=0, le=30)):
+    """Get the status of a submission.
+    
+    Args:
+        wait: Seconds to hold the request open while the submission is still
+            pending (long polling). Returns as soon as a final state is reached.
+    """
+    if submission_id in active_submissions:
+        event = completion_events.get(submission_id)
+        if wait and event is not None:
+            try:
+                await asyncio.wait_for(event.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+        submission = active_submissions.get(submission_id)
+    elif wait:
+        # Possibly accepted by another worker, or before a restart
+        submission = await submission_store.wait_until_final(submission_id, wait)
+    else:
+        submission = await submission_store.load(submission_id)
         
-    submission = active_submissions[submission_id]
+    if submission is None:
+        raise HTTPException(status_code=404, detail="Submission not found")
     
     if submission["status"] == "COMPLETED":
         return submission["verdict"]
@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import os
+from typing import Any, Callable, Optional
+import orjson
+from .models import Verdict
+
+logger = logging.getLogger(__name__)
+
+# When set, submission states are mirrored to Redis so they survive restarts and
+# can be read from any uvicorn worker, e.g. redis://localhost:6379/0
+REDIS_URL = os.getenv("REDIS_URL", "")
+SUBMISSION_TTL = 3600  # seconds, same as the in-process cache
+FINAL_STATUSES = ("COMPLETED", "ERROR")
+CALLBACK_CHANNEL_PREFIX = "judge0:callback:"
+
+_redis: Optional[Any] = None  # redis.asyncio.Redis, only imported when REDIS_URL is set
+
+def _state_key(submission_id: str) -> str:
+    return f"sub:{submission_id}"
+
+def _done_channel(submission_id: str) -> str:
+    return f"sub:done:{submission_id}"
+
+def enabled() -> bool:
+    return _redis is not None
+
+async def connect():
+    """Connect to Redis if REDIS_URL is configured."""
+    global _redis
+    if not REDIS_URL or _redis is not None:
+        return
+    import redis.asyncio as redis
+    _redis = redis.from_url(REDIS_URL)
+    await _redis.ping()
+    logger.info("Mirroring submission states to Redis")
+
+async def close():
+    global _redis
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
+
+def _dumps(entry: dict) -> bytes:
+    if "verdict" in entry:
+        entry = {**entry, "verdict": entry["verdict"].model_dump(mode="json")}
+    return orjson.dumps(entry)
+
+def _loads(data: bytes) -> dict:
+    entry = orjson.loads(data)
+    if "verdict" in entry:
+        entry["verdict"] = Verdict.model_validate(entry["verdict"])
+    return entry
+
+async def save(submission_id: str, entry: dict):
+    """Store a submission state, notifying waiters on other workers once it is final."""
+    if _redis is None:
+        return
+    try:
+        await _redis.set(_state_key(submission_id), _dumps(entry), ex=SUBMISSION_TTL)
+        if entry["status"] in FINAL_STATUSES:
+            await _redis.publish(_done_channel(submission_id), b"")
+    except Exception as e:
+        # The in-process state is still authoritative for this worker
+        logger.warning(f"Could not store submission {submission_id} in Redis: {str(e)}")
+
+async def discard(submission_id: str):
+    if _redis is None:
+        return
+    try:
+        await _redis.delete(_state_key(submission_id))
+    except Exception as e:
+        logger.warning(f"Could not remove submission {submission_id} from Redis: {str(e)}")
+
+async def load(submission_id: str) -> Optional[dict]:
+    if _redis is None:
+        return None
+    data = await _redis.get(_state_key(submission_id))
+    return _loads(data) if data is not None else None
+
+async def wait_until_final(submission_id: str, timeout: float) -> Optional[dict]:
+    """Wait up to `timeout` seconds for a submission judged by another worker to finish."""
+    if _redis is None:
+        return None
+    async with _redis.pubsub() as pubsub:
+        await pubsub.subscribe(_done_channel(submission_id))
+        # Subscribed first, so a completion between this read and the wait isn't missed
+        entry = await load(submission_id)
+        if entry is None or entry["status"] in FINAL_STATUSES:
+            return entry
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while (remaining := deadline - loop.time()) > 0:
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=remaining)
+            if message is not None:
+                break
+    return await load(submission_id)
+
+async def forward_callback(callback_id: str, body: bytes) -> bool:
+    """Publish a Judge0 callback this worker doesn't own, for the worker waiting on it."""
+    if _redis is None:
+        return False
+    return await _redis.publish(CALLBACK_CHANNEL_PREFIX + callback_id, body) > 0
+
+async def listen_for_callbacks(deliver: Callable[[str, bytes], bool]):
+    """Hand callbacks forwarded by other workers to `deliver` until cancelled."""
+    while True:
+        try:
+            async with _redis.pubsub() as pubsub:
+                await pubsub.psubscribe(CALLBACK_CHANNEL_PREFIX + "*")
+                async for message in pubsub.listen():
+                    if message["type"] != "pmessage":
+                        continue
+                    # Every worker receives every callback; only the one that owns it delivers it
+                    callback_id = message["channel"].decode()[len(CALLBACK_CHANNEL_PREFIX):]
+                    deliver(callback_id, message["data"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Unforwarded callbacks fall back to polling after JUDGE0_CALLBACK_TIMEOUT
+            logger.warning(f"Lost Redis callback subscription, reconnecting: {str(e)}")
+            await asyncio.sleep(1)
@@ -1,24 +1,70 @@
 import os
+import re
 import json
-from PyPDF2 import PdfReader
+import asyncio
+import pypdfium2 as pdfium
 import subprocess
 import logging
 import random
+import time
+import threading
+import tempfile
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
 def read_pdf_content(pdf_path: str) -> str:
+    """Extract the text of a PDF, reusing the `<pdf>.txt` written next to it when still fresh."""
+    text_path = pdf_path + ".txt"
     try:
-        reader = PdfReader(pdf_path)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text()
-        return text
+        if os.stat(text_path).st_mtime_ns >= os.stat(pdf_path).st_mtime_ns:
+            with open(text_path, "r", encoding="utf-8") as f:
+                return f.read()
+    except OSError:
+        pass
+    
+    text = _extract_pdf_text(pdf_path)
+    tmp_path = None
+    try:
+        # Write to a unique temp file then rename, so a concurrent reader or writer
+        # (another process, or another thread loading the same problem) never sees a partial file
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(text_path),
+            prefix=os.path.basename(text_path) + ".",
+            suffix=".tmp"
+        )
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        # mkstemp creates the file as 0600
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, text_path)
+    except OSError as e:
+        logger.warning(f"Could not cache extracted text at {text_path}: {str(e)}")
+        if tmp_path is not None:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+    return text
+
+# PDFium is not thread-safe, even across documents, and statements are parsed from worker threads
+_pdfium_lock = threading.Lock()
+
+def _extract_pdf_text(pdf_path: str) -> str:
+    try:
+        with _pdfium_lock:
+            pdf = pdfium.PdfDocument(pdf_path)
+            try:
+                pages = []
+                for page in pdf:
+                    textpage = page.get_textpage()
+                    pages.append(textpage.get_text_range())
+                    textpage.close()
+                    page.close()
+                return "".join(pages)
+            finally:
+                pdf.close()
     except Exception as e:
         raise Exception(f"Error reading PDF file: {str(e)}")
 
@@ -27,17 +73,47 @@ def read_limits(problem_path: str) -> dict:
     if not os.path.exists(limits_path):
         raise Exception(f"Limits file not found at {limits_path}")
         
+    return _read_limits_cached(limits_path, os.stat(limits_path).st_mtime_ns)
+
+async def aread_limits(problem_path: str) -> dict:
+    """read_limits off the event loop, since a cold read runs the limits script."""
+    return await asyncio.to_thread(read_limits, problem_path)
+
+# BOCA limits scripts are usually just a series of echo lines
+_LIMITS_ECHO_LINE = re.compile(r"""^\s*echo\s+["']?([0-9.]+)["']?\s*(?:#.*)?$""")
+_LIMITS_INERT_LINE = re.compile(r"^\s*(?:#.*|exit(?:\s+0)?\s*)?$")
+
+def _parse_limits_script(script: str) -> Optional[List[str]]:
+    """Extract the echoed values from a limits script, or None if it contains real logic."""
+    values = []
+    for line in script.splitlines():
+        match = _LIMITS_ECHO_LINE.match(line)
+        if match:
+            values.append(match.group(1))
+        elif not _LIMITS_INERT_LINE.match(line):
+            return None
+    return values
+
+def _run_limits_script(limits_path: str) -> List[str]:
+    # Execute the limits script and capture its output
+    result = subprocess.run(
+        ["bash", limits_path],
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return result.stdout.strip().split("\n")
+
+@lru_cache(maxsize=256)
+def _read_limits_cached(limits_path: str, mtime_ns: int) -> dict:
     try:
-        # Execute the limits script and capture its output
-        result = subprocess.run(
-            ["bash", limits_path],
-            capture_output=True,
-            text=True,
-            check=True
-        )
+        with open(limits_path, "r") as f:
+            lines = _parse_limits_script(f.read())
+        # Only fork a shell for scripts that compute their limits
+        if lines is None:
+            lines = _run_limits_script(limits_path)
         
         # Parse the output lines
-        lines = result.stdout.strip().split("\n")
         if len(lines) < 3:
             raise Exception("Invalid limits file output format")
             
@@ -54,34 +130,69 @@ def read_limits(problem_path: str) -> dict:
 
 def get_test_cases(problem_path: str) -> list:
     """Get all test cases from input/ and output/ folders."""
-    test_cases = []
-    
     # Get absolute paths
     abs_problem_path = os.path.abspath(problem_path)
     input_dir = os.path.join(abs_problem_path, "input")
     output_dir = os.path.join(abs_problem_path, "output")
     
     if not os.path.exists(input_dir) or not os.path.exists(output_dir):
-        return test_cases
-        
-    for input_file in os.listdir(input_dir):
-        # Get the test case number from the input file name
-        # Example: F_0001 -> 0001
-        test_case_num = input_file.split("_")[-1]
-        output_file = input_file
+        return []
         
-        input_path = os.path.join(input_dir, input_file)
-        output_path = os.path.join(output_dir, output_file)
-        
-        if os.path.exists(output_path):
-            with open(input_path, "r") as f:
-                input_data = f.read()
-            with open(output_path, "r") as f:
-                output_data = f.read()
-            test_cases.append((input_data, output_data))
+    # Adding or removing test files changes the directories' mtimes
+    return _get_test_cases_cached(input_dir, output_dir, os.stat(input_dir).st_mtime_ns, os.stat(output_dir).st_mtime_ns)
+
+def problem_fingerprint(problem_path: str) -> str:
+    """Modification times of the limits script and test directories, which change when they are edited."""
+    paths = (
+        os.path.join(problem_path, "limits", "cpp"),
+        os.path.join(problem_path, "input"),
+        os.path.join(problem_path, "output")
+    )
+    mtimes = []
+    for path in paths:
+        try:
+            mtimes.append(str(os.stat(path).st_mtime_ns))
+        except OSError:
+            mtimes.append("-")
+    return ":".join(mtimes)
+
+async def aget_test_cases(problem_path: str) -> list:
+    """get_test_cases off the event loop, so a cold read doesn't block other submissions."""
+    return await asyncio.to_thread(get_test_cases, problem_path)
+
+@lru_cache(maxsize=64)
+def _get_test_cases_cached(input_dir: str, output_dir: str, input_mtime_ns: int, output_mtime_ns: int) -> list:
+    """Read (input, expected_output) pairs as raw bytes, ready to be base64-encoded for Judge0."""
+    # scandir entries carry the stat info, so each file is stat'ed once and opened once
+    with os.scandir(input_dir) as it:
+        inputs = {entry.name: entry for entry in it if entry.is_file()}
+    with os.scandir(output_dir) as it:
+        outputs = {entry.name: entry for entry in it if entry.is_file()}
+    
+    test_cases = []
+    # Input and output files share the same name, e.g. F_0001
+    for name, input_entry in inputs.items():
+        output_entry = outputs.get(name)
+        if output_entry is not None:
+            test_cases.append((_read_file_bytes(input_entry), _read_file_bytes(output_entry)))
             
     return test_cases
 
+def _read_file_bytes(entry: os.DirEntry) -> bytes:
+    fd = os.open(entry.path, os.O_RDONLY)
+    try:
+        size = entry.stat().st_size
+        chunks = [os.read(fd, size)]
+        # Keep reading in case the file grew since it was stat'ed
+        while True:
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        return b"".join(chunks) if len(chunks) > 1 else chunks[0]
+    finally:
+        os.close(fd)
+
 def read_problem_info(problem_path: str) -> dict:
     """Read problem info from problem.info file."""
     info_path = os.path.join(problem_path, "description", "problem.info")
@@ -115,8 +226,14 @@ problem_pool = [
         #("latam2024", "F"),
     ]
 
-def get_random_problems(num_problems: int = 5) -> list:
-    """Get random problems from Contests directory."""
+PROBLEM_LIST_TTL = 300  # seconds
+
+@lru_cache(maxsize=1)
+def _list_problems_cached(ttl_bucket: int) -> frozenset:
+    """Collect all valid problems under Contests/.
+    
+    `ttl_bucket` changes every PROBLEM_LIST_TTL seconds, which expires the cache.
+    """
     contests_dir = "Contests"
     all_problems = []
     
@@ -130,22 +247,38 @@ def get_random_problems(num_problems: int = 5) -> list:
                     # Check if it's a valid problem directory
                     if os.path.exists(os.path.join(problem_path, "description", "problem.info")):
                         all_problems.append((contest, problem))
-    
-    # Use only problems in problem_pool, since they are the easiest
-    all_problems = problem_pool
+                        
+    return frozenset(all_problems)
 
+def list_problems() -> frozenset:
+    """Return the (contest, problem) pairs available under Contests/."""
+    return _list_problems_cached(int(time.time() // PROBLEM_LIST_TTL))
 
-    # Select random problems
-    selected = random.sample(all_problems, min(num_problems, len(all_problems)))
-    
-    # Get problem info for each selected problem
-    result = []
-    for contest, problem in selected:
+# (contest, problem) -> {"problem_id", "name"} for every problem in problem_pool found on disk
+PROBLEM_INFO: Dict[Tuple[str, str], dict] = {}
+
+def load_problem_info() -> Dict[Tuple[str, str], dict]:
+    """Read problem.info for every problem in problem_pool once, into PROBLEM_INFO."""
+    contests_dir = "Contests"
+    problem_info = {}
+    for contest, problem in problem_pool:
         problem_path = os.path.join(contests_dir, contest, problem)
+        # Check if it's a valid problem directory
+        if not os.path.exists(os.path.join(problem_path, "description", "problem.info")):
+            continue
         info = read_problem_info(problem_path)
-        result.append({
+        problem_info[(contest, problem)] = {
             "problem_id": f"{contest}/{problem}",
             "name": info.get("name", "Unknown Problem")
-        })
-        
-    return result 
\ No newline at end of file
+        }
+    PROBLEM_INFO.clear()
+    PROBLEM_INFO.update(problem_info)
+    return PROBLEM_INFO
+
+def get_random_problems(num_problems: int = 5) -> list:
+    """Get random problems from problem_pool, since they are the easiest."""
+    if not PROBLEM_INFO:
+        load_problem_info()
+    
+    # Select random problems
+    return random.sample(list(PROBLEM_INFO.values()), min(num_problems, len(PROBLEM_INFO)))
@@ -8,4 +8,15 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 import uvicorn
 
 if __name__ == "__main__":
-    uvicorn.run("backend.main:app", host="0.0.0.0", port=8000, reload=True) 
\ No newline at end of file
+    # The submission queue lives in-process and statuses are only visible to
+    # other workers when mirrored to Redis, so use more than one worker only
+    # together with REDIS_URL
+    uvicorn.run(
+        "backend.main:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="uvloop",
+        http="httptools",
+        workers=int(os.getenv("WORKERS", "1")),
+        reload=os.getenv("DEV") == "1"
+    )